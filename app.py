@@ -20,14 +20,67 @@
 # https://gradio.app/docs/#dropdown
 
 import os
+import queue
+import threading
 import time
-import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import gradio as gr
-import soundfile as sf
+import numpy as np
 
-from model import get_pretrained_model, language_to_models
+from model import (
+    all_models,
+    download_and_extract,
+    download_model,
+    get_pretrained_model,
+    language_to_models,
+    warm_all,
+)
+
+
+# onnxruntime already uses all the threads we give it for a single
+# utterance, so running several requests in parallel only makes each of
+# them slower. Serialize the calls to tts.generate() instead.
+_INFER_LOCK = threading.Lock()
+
+
+class SynthesisCache:
+    """An LRU cache for generated audio that is bounded by the total number
+    of bytes of the cached samples instead of by the number of entries.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.cache:
+                return None
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+    def put(self, key, sample_rate: int, samples: np.ndarray):
+        if samples.nbytes > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.cache:
+                return
+
+            self.cache[key] = (sample_rate, samples)
+            self.num_bytes += samples.nbytes
+            while self.num_bytes > self.max_bytes:
+                _, (_, evicted) = self.cache.popitem(last=False)
+                self.num_bytes -= evicted.nbytes
+
+
+# Key is (repo_id, sid, speed, text)
+_synthesis_cache = SynthesisCache(max_bytes=256 * 1024 * 1024)
 
 
 def MyPrint(s):
@@ -97,16 +150,23 @@ examples = [
 ]
 
 
-def update_model_dropdown(language: str):
-    if language in language_to_models:
-        choices = language_to_models[language]
-        return gr.Dropdown(
-            choices=choices,
-            value=choices[0],
-            interactive=True,
-        )
+# Maps a language to (choices, default model) for the model dropdown
+_language_to_dropdown = {
+    language: (list(models), models[0])
+    for language, models in language_to_models.items()
+}
+
 
-    raise ValueError(f"Unsupported language: {language}")
+def update_model_dropdown(language: str):
+    if language not in _language_to_dropdown:
+        raise ValueError(f"Unsupported language: {language}")
+
+    choices, value = _language_to_dropdown[language]
+    return gr.Dropdown(
+        choices=choices,
+        value=value,
+        interactive=True,
+    )
 
 
 def build_html_output(s: str, style: str = "result_item_success"):
@@ -119,45 +179,99 @@ def build_html_output(s: str, style: str = "result_item_success"):
     """
 
 
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    """Convert float32 samples in [-1, 1] to int16. Note that the input
+    array is modified in-place to avoid temporary copies.
+    """
+    np.clip(samples, -1.0, 1.0, out=samples)
+    samples *= 32767
+    return samples.astype(np.int16)
+
+
 def process(language: str, repo_id: str, text: str, sid: str, speed: float):
     MyPrint(f"Input text: {text}. sid: {sid}, speed: {speed}")
     sid = int(sid)
-    tts = get_pretrained_model(repo_id, speed)
 
-    start = time.time()
-    audio = tts.generate(text, sid=sid)
-    end = time.time()
+    key = (repo_id, sid, speed, text)
+    cached = _synthesis_cache.get(key)
+    if cached is not None:
+        sample_rate, samples = cached
+        duration = len(samples) / sample_rate
+        info = f"""
+        Wave duration  : {duration:.3f} s <br/>
+        Served from cache <br/>
+        """
+        MyPrint(info)
+        yield cached, build_html_output(info)
+        return
+
+    tts = get_pretrained_model(repo_id)
+
+    # tts.generate() invokes the callback once per generated sentence.
+    # It runs in a separate thread so that we can send each sentence to
+    # the browser as soon as it is ready.
+    chunks = queue.Queue()
+    error = []
+
+    def run():
+        def callback(samples, progress):
+            # The conversion to int16 is done by the consumer so that
+            # generation of the next sentence is not delayed.
+            samples = np.asarray(samples, dtype=np.float32)
+            chunks.put((samples, time.time() - start))
+            return 1
+
+        try:
+            with _INFER_LOCK:
+                start = time.time()
+                tts.generate(text, sid=sid, speed=speed, callback=callback)
+        except Exception as e:
+            error.append(e)
+        finally:
+            chunks.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    generated = []
+    num_samples = 0
+    while True:
+        item = chunks.get()
+        if item is None:
+            break
+
+        samples, elapsed_seconds = item
+        if len(samples) == 0:
+            continue
+
+        samples = to_int16(samples)
+
+        generated.append(samples)
+        num_samples += len(samples)
+
+        duration = num_samples / tts.sample_rate
+        rtf = elapsed_seconds / duration
+
+        info = f"""
+        Wave duration  : {duration:.3f} s <br/>
+        Processing time: {elapsed_seconds:.3f} s <br/>
+        RTF: {elapsed_seconds:.3f}/{duration:.3f} = {rtf:.3f} <br/>
+        """
+
+        yield (tts.sample_rate, samples), build_html_output(info)
 
-    if len(audio.samples) == 0:
+    if error:
+        raise error[0]
+
+    if num_samples == 0:
         raise ValueError(
             "Error in generating audios. Please read previous error messages."
         )
 
-    duration = len(audio.samples) / audio.sample_rate
-
-    elapsed_seconds = end - start
-    rtf = elapsed_seconds / duration
-
-    info = f"""
-    Wave duration  : {duration:.3f} s <br/>
-    Processing time: {elapsed_seconds:.3f} s <br/>
-    RTF: {elapsed_seconds:.3f}/{duration:.3f} = {rtf:.3f} <br/>
-    """
+    _synthesis_cache.put(key, tts.sample_rate, np.concatenate(generated))
 
     MyPrint(info)
     MyPrint(f"\nrepo_id: {repo_id}\ntext: {text}\nsid: {sid}\nspeed: {speed}")
 
-    filename = str(uuid.uuid4())
-    filename = f"{filename}.wav"
-    sf.write(
-        filename,
-        audio.samples,
-        samplerate=audio.sample_rate,
-        subtype="PCM_16",
-    )
-
-    return filename, build_html_output(info)
-
 
 demo = gr.Blocks(css=css)
 
@@ -173,9 +287,9 @@ with demo:
     )
 
     model_dropdown = gr.Dropdown(
-        choices=language_to_models[language_choices[0]],
+        choices=_language_to_dropdown[language_choices[0]][0],
         label="Select a model",
-        value=language_to_models[language_choices[0]][0],
+        value=_language_to_dropdown[language_choices[0]][1],
     )
 
     language_radio.change(
@@ -212,7 +326,7 @@ with demo:
 
             input_button = gr.Button("Submit")
 
-            output_audio = gr.Audio(label="Output")
+            output_audio = gr.Audio(label="Output", streaming=True, autoplay=True)
 
             output_info = gr.HTML(label="Info")
 
@@ -251,17 +365,102 @@ with demo:
 
 
 def download_espeak_ng_data():
-    os.system(
-        """
-    cd /tmp
-    wget -qq https://github.com/k2-fsa/sherpa-onnx/releases/download/tts-models/espeak-ng-data.tar.bz2
-    tar xf espeak-ng-data.tar.bz2
-    """
-    )
+    dst = "/tmp/espeak-ng-data"
+    if os.path.isdir(dst):
+        MyPrint(f"Skip downloading espeak-ng-data since {dst} exists")
+        return
+
+    url = "https://github.com/k2-fsa/sherpa-onnx/releases/download/tts-models/espeak-ng-data.tar.bz2"
+    download_and_extract(url, dst)
+
+
+def get_default_model() -> str:
+    language = language_choices[0]
+    return language_to_models[language][0]
+
+
+def prewarm_default_model():
+    repo_id = get_default_model()
+
+    tts = prewarm_model(repo_id)
+    if tts is None:
+        return
+
+    # Run a dummy utterance so that onnxruntime finishes its lazy
+    # initialization before the first real request arrives.
+    try:
+        tts.generate("hello", sid=0)
+    except Exception as e:
+        # It is only an optimization, so don't stop the server from
+        # starting.
+        MyPrint(f"Failed to prewarm {repo_id}: {e}")
+
+
+def warm_all_models():
+    MyPrint("Downloading all models")
+    start = time.time()
+    failed = warm_all()
+    end = time.time()
+    MyPrint(f"Downloaded all models in {end - start:.3f} s")
+    for repo_id, error in failed:
+        MyPrint(f"Failed to download {repo_id}: {error}")
+
+
+def prewarm_model(repo_id: str):
+    """Load the given model. Return it, or None if loading it fails."""
+    MyPrint(f"Prewarming {repo_id}")
+    try:
+        start = time.time()
+        tts = get_pretrained_model(repo_id)
+        end = time.time()
+        MyPrint(f"Prewarmed {repo_id} in {end - start:.3f} s")
+        return tts
+    except Exception as e:
+        MyPrint(f"Failed to prewarm {repo_id}: {e}")
+        return None
 
 
 if __name__ == "__main__":
-    download_espeak_ng_data()
+    # Both are I/O bound, so download them in parallel. The model can only
+    # be loaded after espeak-ng-data is available.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {
+            "espeak-ng-data": executor.submit(download_espeak_ng_data),
+            get_default_model(): executor.submit(
+                download_model, get_default_model()
+            ),
+        }
+        # Start the server anyway. What is missing is downloaded again,
+        # or fails, on the first request that needs it.
+        for name, f in futures.items():
+            try:
+                f.result()
+            except Exception as e:
+                MyPrint(f"Failed to download {name}: {e}")
+
+    prewarm_default_model()
+
+    # Set K2_TTS_WARM_ALL=1 to download all models in the background so
+    # that the first request for any of them does not wait for a download
+    if os.environ.get("K2_TTS_WARM_ALL", "0") == "1":
+        threading.Thread(target=warm_all_models, daemon=True).start()
+
+    # Set K2_PREWARM_MODELS to a comma-separated list of repo IDs to load
+    # them in the background, e.g., the most popular voices. How many of
+    # them stay loaded is limited by K2_TTS_MAX_MODEL_BYTES. Both plain
+    # repo IDs, e.g., csukuangfj/vits-zh-hf-fanchen-C, and entries of the
+    # model dropdown, e.g., csukuangfj/vits-zh-hf-fanchen-C|187, work.
+    dropdown_entries = {m.split("|")[0]: m for m in all_models}
+    prewarm_repo_ids = [
+        r.strip() for r in os.environ.get("K2_PREWARM_MODELS", "").split(",")
+    ]
+    prewarm_repo_ids = [dropdown_entries.get(r, r) for r in prewarm_repo_ids if r]
+    if prewarm_repo_ids:
+        executor = ThreadPoolExecutor(max_workers=2)
+        for repo_id in prewarm_repo_ids:
+            executor.submit(prewarm_model, repo_id)
+        executor.shutdown(wait=False)
+
     formatter = "%(asctime)s %(levelname)s [%(filename)s:%(lineno)d] %(message)s"
 
     demo.launch()
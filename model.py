@@ -14,817 +14,997 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import fcntl
+import importlib.util
 import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, List, Optional, Tuple
+
+
+def _get_num_cpus() -> int:
+    """Return the number of CPUs this process may use.
+
+    os.cpu_count() returns the number of CPUs of the host, but a docker
+    container, e.g., a Hugging Face Space, is usually limited to fewer
+    of them by a CPU affinity mask or a cgroup CPU quota.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        n = len(os.sched_getaffinity(0))
+    else:
+        n = os.cpu_count() or 1
+
+    # cgroup v2: "max 100000" or "<quota> <period>"
+    # cgroup v1: cpu.cfs_quota_us is -1 if there is no limit
+    for quota_file, period_file in [
+        ("/sys/fs/cgroup/cpu.max", None),
+        (
+            "/sys/fs/cgroup/cpu/cpu.cfs_quota_us",
+            "/sys/fs/cgroup/cpu/cpu.cfs_period_us",
+        ),
+    ]:
+        try:
+            with open(quota_file) as f:
+                fields = f.read().split()
+            if period_file is not None:
+                with open(period_file) as f:
+                    fields.append(f.read().strip())
+        except OSError:
+            continue
+
+        if fields[0] not in ("max", "-1"):
+            n = min(n, max(1, int(fields[0]) // int(fields[1])))
+        break
+
+    return n
+
+
+# Number of threads for onnxruntime. Only one model runs at a time (see
+# app.py), so each session may use all available CPUs up to 4. It can be
+# overridden with the environment variable K2_TTS_THREADS, e.g.,
+# K2_TTS_THREADS=1 on shared cores.
+num_threads = int(os.environ.get("K2_TTS_THREADS", min(_get_num_cpus(), 4)))
+
+# Set K2_TTS_DEBUG=1 to let sherpa-onnx print verbose model information
+debug = os.environ.get("K2_TTS_DEBUG", "0") == "1"
+
+# It must be set before onnxruntime is loaded by sherpa_onnx
+os.environ.setdefault("OMP_NUM_THREADS", str(num_threads))
+os.environ.setdefault("MKL_NUM_THREADS", str(num_threads))
+
+# Use the Rust based hf_transfer for downloads if it is installed.
+# It must be set before huggingface_hub is imported. huggingface_hub
+# raises if it is enabled but not installed, so check for it first.
+if importlib.util.find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
 
 import sherpa_onnx
-from huggingface_hub import hf_hub_download
-
-
-def get_file(
-    repo_id: str,
-    filename: str,
-    subfolder: str = ".",
-) -> str:
-    model_filename = hf_hub_download(
-        repo_id=repo_id,
-        filename=filename,
-        subfolder=subfolder,
-    )
-    return model_filename
+from huggingface_hub import (
+    list_repo_files,
+    snapshot_download,
+    try_to_load_from_cache,
+)
+from huggingface_hub.constants import HF_HUB_CACHE
+
+# onnxruntime execution provider, e.g., cuda or coreml. It can be set with
+# the environment variable K2_TTS_PROVIDER. Providers other than cpu need
+# a sherpa-onnx build that supports them; the one in requirements.txt
+# supports only cpu.
+provider = os.environ.get("K2_TTS_PROVIDER", "cpu")
+
+# Model variants to look for, in order of preference. onnxruntime's CPU
+# provider has few float16 kernels and would insert casts around most
+# nodes, so float16 models are only used with other providers, where
+# dynamically quantized int8 models are not a good fit in turn.
+if provider == "cpu":
+    model_suffixes = (".int8.onnx", ".onnx")
+else:
+    model_suffixes = (".fp16.onnx", ".onnx")
+
+
+def _find_in_cache(repo_id: str, filenames: Tuple[str, ...]) -> Optional[str]:
+    """Return the local snapshot directory of repo_id if all of the given
+    files are already in the Hugging Face cache. Return None otherwise.
+
+    It does not contact the hub.
+    """
+    repo_dir = None
+    for f in filenames:
+        # It returns a str only if the file is in the cache
+        path = try_to_load_from_cache(repo_id=repo_id, filename=f)
+        if not isinstance(path, str):
+            return None
+        repo_dir = os.path.dirname(path)
+
+    return repo_dir
+
+
+# The results of the functions below are small and there is at most one
+# entry per supported model, so their caches need no eviction.
+# lru_cache(maxsize=None) is functools.cache, which needs Python 3.9.
+@lru_cache(maxsize=None)
+def _fetch_repo(repo_id: str, filenames: Tuple[str, ...]) -> str:
+    """Download the given files from repo_id with a single
+    snapshot_download() call and return the local directory.
+
+    Files that are already in the cache from a previous run are used
+    without contacting the hub. The result is cached so later calls in
+    this process don't need to check again.
+    """
+    repo_dir = _find_in_cache(repo_id, filenames)
+    if repo_dir is None:
+        repo_dir = snapshot_download(
+            repo_id=repo_id,
+            allow_patterns=list(filenames),
+        )
+    return repo_dir
 
 
-@lru_cache(maxsize=10)
-def _get_vits_vctk(repo_id: str, speed: float) -> sherpa_onnx.OfflineTts:
-    assert repo_id == "csukuangfj/vits-vctk"
+@lru_cache(maxsize=None)
+def _list_repo_files(repo_id: str) -> Tuple[str, ...]:
+    return tuple(list_repo_files(repo_id))
 
-    model = get_file(
-        repo_id=repo_id,
-        filename="vits-vctk.onnx",
-        subfolder=".",
-    )
 
-    lexicon = get_file(
-        repo_id=repo_id,
-        filename="lexicon.txt",
-        subfolder=".",
-    )
+# The model variant selected for each repo is saved here, so that repos
+# without a more preferred variant are not listed again on every start
+_selected_model_dir = os.path.join(HF_HUB_CACHE, "k2-tts-selected-models")
 
-    tokens = get_file(
-        repo_id=repo_id,
-        filename="tokens.txt",
-        subfolder=".",
-    )
 
-    tts_config = sherpa_onnx.OfflineTtsConfig(
-        model=sherpa_onnx.OfflineTtsModelConfig(
-            vits=sherpa_onnx.OfflineTtsVitsModelConfig(
-                model=model,
-                lexicon=lexicon,
-                tokens=tokens,
-                length_scale=1.0 / speed,
-            ),
-            provider="cpu",
-            debug=True,
-            num_threads=2,
-        ),
-        max_num_sentences=1,
-    )
-    tts = sherpa_onnx.OfflineTts(tts_config)
+def _load_selected_model_file(repo_id: str, name: str) -> Optional[str]:
+    try:
+        with open(os.path.join(_selected_model_dir, repo_id, name)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
 
-    return tts
 
+def _save_selected_model_file(repo_id: str, name: str, model: str) -> None:
+    d = os.path.join(_selected_model_dir, repo_id)
+    try:
+        os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d)
+        with os.fdopen(fd, "w") as f:
+            f.write(model)
+        os.replace(tmp, os.path.join(d, name))
+    except OSError:
+        # It only saves listing the repo next time
+        pass
 
-@lru_cache(maxsize=10)
-def _get_vits_ljs(repo_id: str, speed: float) -> sherpa_onnx.OfflineTts:
-    assert repo_id == "csukuangfj/vits-ljs"
 
-    model = get_file(
-        repo_id=repo_id,
-        filename="vits-ljs.onnx",
-        subfolder=".",
-    )
+@lru_cache(maxsize=None)
+def _select_model_file(repo_id: str, name: str) -> str:
+    """Return the filename of the preferred variant of the given model."""
+    # If the most preferred variant is already in the cache, there is no
+    # need to list the repo. A less preferred one in the cache, e.g., from
+    # older code that always used .onnx, says nothing about whether the
+    # repo has a better one, unless it was selected by a previous run.
+    model = f"{name}{model_suffixes[0]}"
+    if _find_in_cache(repo_id, (model,)) is not None:
+        return model
 
-    lexicon = get_file(
-        repo_id=repo_id,
-        filename="lexicon.txt",
-        subfolder=".",
-    )
+    model = _load_selected_model_file(repo_id, name)
+    if model is not None and _find_in_cache(repo_id, (model,)) is not None:
+        return model
 
-    tokens = get_file(
-        repo_id=repo_id,
-        filename="tokens.txt",
-        subfolder=".",
-    )
+    try:
+        available = _list_repo_files(repo_id)
+    except Exception:
+        # The hub is not reachable or HF_HUB_OFFLINE is set. Use the most
+        # preferred variant in the cache, if any.
+        for suffix in model_suffixes:
+            if _find_in_cache(repo_id, (f"{name}{suffix}",)) is not None:
+                return f"{name}{suffix}"
+        raise
 
-    tts_config = sherpa_onnx.OfflineTtsConfig(
-        model=sherpa_onnx.OfflineTtsModelConfig(
-            vits=sherpa_onnx.OfflineTtsVitsModelConfig(
-                model=model,
-                lexicon=lexicon,
-                tokens=tokens,
-                length_scale=1.0 / speed,
-            ),
-            provider="cpu",
-            debug=True,
-            num_threads=2,
-        ),
-        max_num_sentences=1,
-    )
-    tts = sherpa_onnx.OfflineTts(tts_config)
+    for suffix in model_suffixes:
+        if f"{name}{suffix}" in available:
+            _save_selected_model_file(repo_id, name, f"{name}{suffix}")
+            return f"{name}{suffix}"
 
-    return tts
+    raise ValueError(f"No {name}.onnx in {repo_id}")
 
 
-@lru_cache(maxsize=10)
-def _get_vits_piper(repo_id: str, speed: float) -> sherpa_onnx.OfflineTts:
-    data_dir = "/tmp/espeak-ng-data"
-    repo_id = repo_id.split("|")[0]
+# Maps the prefix of a repo name to the model name of such repos. None
+# means the model is named after the repo, without the prefix, e.g.,
+# vits-piper-en_US-amy-low -> en_US-amy-low
+_piper_name_rules = (
+    ("vits-piper-", None),
+    ("vits-mimic3-", None),
+    ("vits-coqui-", "model"),
+)
 
-    if "coqui" in repo_id or "vits-mms" in repo_id:
-        name = "model"
-    elif "piper" in repo_id:
-        n = len("vits-piper-")
-        name = repo_id.split("/")[1][n:]
-    elif "mimic3" in repo_id:
-        n = len("vits-mimic3-")
-        name = repo_id.split("/")[1][n:]
-    else:
-        raise ValueError(f"Unsupported {repo_id}")
 
-    if "vits-coqui-uk-mai" in repo_id or "vits-mms" in repo_id:
-        data_dir = ""
+def _piper_model_name(repo_id: str) -> str:
+    repo_name = repo_id.split("/")[1]
+    for prefix, name in _piper_name_rules:
+        if repo_name.startswith(prefix):
+            return name if name is not None else repo_name[len(prefix) :]
 
-    model = get_file(
-        repo_id=repo_id,
-        filename=f"{name}.onnx",
-        subfolder=".",
-    )
+    raise ValueError(f"Unsupported {repo_id}")
 
-    tokens = get_file(
-        repo_id=repo_id,
-        filename="tokens.txt",
-        subfolder=".",
-    )
 
-    tts_config = sherpa_onnx.OfflineTtsConfig(
-        model=sherpa_onnx.OfflineTtsModelConfig(
-            vits=sherpa_onnx.OfflineTtsVitsModelConfig(
-                model=model,
-                lexicon="",
-                data_dir=data_dir,
-                tokens=tokens,
-                length_scale=1.0 / speed,
-            ),
-            provider="cpu",
-            debug=True,
-            num_threads=2,
-        ),
-        max_num_sentences=1,
+def _hf_model_name(repo_id: str) -> str:
+    if "fanchen" in repo_id or "vits-cantonese-hf-xiaomaiiwn" in repo_id:
+        return repo_id.split("/")[-1]
+    elif "csukuangfj/vits-melo-tts-zh_en" == repo_id:
+        return "model"
+    elif "sherpa-onnx-vits-zh-ll" in repo_id:
+        return "model"
+    else:
+        return repo_id.split("-")[-1]
+
+
+def download_and_extract(url: str, dst: str) -> None:
+    """Download the .tar.bz2 file at url and extract it to dst.
+
+    The top-level directory of the archive must be named like dst, e.g.,
+    dict for /tmp/dict. Nothing is done if dst already exists.
+    """
+    if Path(dst).is_dir():
+        return
+
+    # Several threads or worker processes may need dst at the same time.
+    # Only one of them should download and extract it.
+    with open(f"{dst}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if Path(dst).is_dir():
+            return
+
+        filename, _ = urllib.request.urlretrieve(url)
+
+        # Extract to a temporary directory and rename it so that dst
+        # never exists in a partially extracted state
+        parent = os.path.dirname(dst)
+        tmp_dir = tempfile.mkdtemp(dir=parent)
+        try:
+            with tarfile.open(filename, "r:bz2") as f:
+                f.extractall(tmp_dir)
+            os.rename(os.path.join(tmp_dir, os.path.basename(dst)), dst)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.remove(filename)
+
+
+def _download_jieba_dict():
+    download_and_extract(
+        "https://github.com/csukuangfj/cppjieba/releases/download/sherpa-onnx-2024-04-19/dict.tar.bz2",
+        "/tmp/dict",
     )
-    tts = sherpa_onnx.OfflineTts(tts_config)
 
-    return tts
 
+@dataclass(frozen=True)
+class ModelSpec:
+    # Given a repo_id, return the model filename without the .onnx suffix
+    model_name: Callable[[str], str]
+
+    # True if the repo contains lexicon.txt
+    uses_lexicon: bool = True
+
+    # espeak-ng data dir for piper-like models
+    data_dir: str = ""
+
+    # jieba dict dir for Chinese models
+    dict_dir: str = ""
+
+    rule_fsts: Tuple[str, ...] = ()
+    rule_fars: Tuple[str, ...] = ()
+
+
+SPECS = {
+    "vctk": ModelSpec(model_name=lambda repo_id: "vits-vctk"),
+    "ljs": ModelSpec(model_name=lambda repo_id: "vits-ljs"),
+    "zh_aishell3": ModelSpec(
+        model_name=lambda repo_id: "vits-aishell3",
+        rule_fsts=("phone.fst", "date.fst", "number.fst", "new_heteronym.fst"),
+        rule_fars=("rule.far",),
+    ),
+    "piper": ModelSpec(
+        model_name=_piper_model_name,
+        uses_lexicon=False,
+        data_dir="/tmp/espeak-ng-data",
+    ),
+    # Models that ship their own tokens.txt for characters and don't use
+    # espeak-ng, e.g., MMS models and vits-coqui-uk-mai
+    "mms": ModelSpec(
+        model_name=lambda repo_id: "model",
+        uses_lexicon=False,
+    ),
+    "hf": ModelSpec(
+        model_name=_hf_model_name,
+        dict_dir="/tmp/dict",
+        rule_fsts=("phone.fst", "date.fst", "number.fst"),
+    ),
+    "hf_cantonese": ModelSpec(
+        model_name=_hf_model_name,
+        rule_fsts=("rule.fst",),
+    ),
+}
+
+
+def _download(repo_id: str, spec: ModelSpec) -> Tuple[str, str]:
+    """Download all files the given model needs.
+
+    Returns a tuple (repo_dir, model), where model is the filename of the
+    selected .onnx file inside repo_dir.
+    """
+    name = model_names[repo_id]
+
+    files = ("tokens.txt",) + spec.rule_fsts + spec.rule_fars
+    if spec.uses_lexicon:
+        files += ("lexicon.txt",)
+
+    # snapshot_download() already downloads the files of a repo in
+    # parallel. The jieba dict comes from elsewhere, so download it
+    # at the same time.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if spec.dict_dir:
+            jieba_dict = executor.submit(_download_jieba_dict)
+
+        model = _select_model_file(repo_id, name)
+        repo_dir = _fetch_repo(repo_id, (model,) + files)
+
+        if spec.dict_dir:
+            jieba_dict.result()
+
+    return repo_dir, model
+
+
+def download_model(repo_id: str) -> None:
+    """Download the files of the given model without loading it."""
+    spec_key = all_models.get(repo_id)
+    if spec_key is None:
+        raise ValueError(f"Unsupported repo_id: {repo_id}")
 
-@lru_cache(maxsize=10)
-def _get_vits_mms(repo_id: str, speed: float) -> sherpa_onnx.OfflineTts:
-    return _get_vits_piper(repo_id, speed)
+    _download(repo_id.split("|")[0], SPECS[spec_key])
 
 
-@lru_cache(maxsize=10)
-def _get_vits_zh_aishell3(repo_id: str, speed: float) -> sherpa_onnx.OfflineTts:
-    assert repo_id == "csukuangfj/vits-zh-aishell3"
+def warm_all(parallel: bool = True) -> List[Tuple[str, str]]:
+    """Download the files of all supported models so that loading any of
+    them later does not need the network.
 
-    model = get_file(
-        repo_id=repo_id,
-        filename="vits-aishell3.onnx",
-        subfolder=".",
-    )
+    The models are not loaded: all of the onnxruntime sessions together
+    would need far more memory than a Space has.
 
-    lexicon = get_file(
-        repo_id=repo_id,
-        filename="lexicon.txt",
-        subfolder=".",
-    )
+    Returns a list of (repo_id, error) for the models that failed to
+    download.
+    """
+    failed = []
 
-    tokens = get_file(
-        repo_id=repo_id,
-        filename="tokens.txt",
-        subfolder=".",
-    )
+    def download(repo_id: str):
+        try:
+            download_model(repo_id)
+        except Exception as e:
+            failed.append((repo_id, str(e)))
 
-    rule_fsts = ["phone.fst", "date.fst", "number.fst", "new_heteronym.fst"]
+    if parallel:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(download, all_models))
+    else:
+        for repo_id in all_models:
+            download(repo_id)
 
-    rule_fsts = [
-        get_file(
-            repo_id=repo_id,
-            filename=f,
-            subfolder=".",
-        )
-        for f in rule_fsts
-    ]
-    rule_fsts = ",".join(rule_fsts)
-
-    rule_fars = get_file(
-        repo_id=repo_id,
-        filename="rule.far",
-        subfolder=".",
-    )
+    return failed
 
-    tts_config = sherpa_onnx.OfflineTtsConfig(
-        model=sherpa_onnx.OfflineTtsModelConfig(
-            vits=sherpa_onnx.OfflineTtsVitsModelConfig(
-                model=model,
-                lexicon=lexicon,
-                tokens=tokens,
-                length_scale=1.0 / speed,
-            ),
-            provider="cpu",
-            debug=True,
-            num_threads=2,
-        ),
-        rule_fsts=rule_fsts,
-        rule_fars=rule_fars,
-        max_num_sentences=1,
-    )
-    tts = sherpa_onnx.OfflineTts(tts_config)
 
-    return tts
+# Set K2_TTS_OPTIMIZED_MODEL_DIR to a persistent directory to keep models
+# optimized by onnxruntime there, so that later processes skip the graph
+# optimizations when loading them. It requires the onnxruntime Python
+# package, which should match the onnxruntime version used by sherpa-onnx.
+optimized_model_dir = os.environ.get("K2_TTS_OPTIMIZED_MODEL_DIR", "")
 
 
-@lru_cache(maxsize=10)
-def _get_vits_hf(repo_id: str, speed: float) -> sherpa_onnx.OfflineTts:
-    repo_id = repo_id.split("|")[0]
+@lru_cache(maxsize=None)
+def _import_onnxruntime():
+    """Return the onnxruntime module, or None if it is not installed.
 
-    if "fanchen" in repo_id or "vits-cantonese-hf-xiaomaiiwn" in repo_id:
-        model = repo_id.split("/")[-1]
-    elif "csukuangfj/vits-melo-tts-zh_en" == repo_id:
-        model = "model"
-    else:
-        model = repo_id.split("-")[-1]
+    It is cached so that the warning is printed only once.
+    """
+    try:
+        import onnxruntime
+    except ImportError as e:
+        print(
+            f"K2_TTS_OPTIMIZED_MODEL_DIR is set but onnxruntime cannot be "
+            f"imported ({e}). Using the models without optimizing them."
+        )
+        return None
 
-    if "sherpa-onnx-vits-zh-ll" in repo_id:
-        model = "model"
+    return onnxruntime
 
-    if not Path("/tmp/dict").is_dir():
-        os.system(
-            "cd /tmp; curl -SL -O https://github.com/csukuangfj/cppjieba/releases/download/sherpa-onnx-2024-04-19/dict.tar.bz2; tar xvf dict.tar.bz2"
-        )
-    os.system("ls -lh /tmp/dict")
 
-    model = get_file(
-        repo_id=repo_id,
-        filename=f"{model}.onnx",
-        subfolder=".",
-    )
+def _get_optimized_model(repo_id: str, model: str) -> str:
+    """Return the path to an optimized copy of the given model, creating it
+    on first use. Return the model itself if that is not possible.
+    """
+    # The optimized model is created for the CPU provider
+    if not optimized_model_dir or provider != "cpu":
+        return model
+
+    ort = _import_onnxruntime()
+    if ort is None:
+        return model
+
+    name = os.path.basename(model)[: -len(".onnx")]
+    optimized_model = os.path.join(optimized_model_dir, repo_id, f"{name}.opt.onnx")
+    if os.path.isfile(optimized_model):
+        return optimized_model
+
+    os.makedirs(os.path.dirname(optimized_model), exist_ok=True)
 
-    lexicon = get_file(
-        repo_id=repo_id,
-        filename="lexicon.txt",
-        subfolder=".",
+    # Write to a temporary file first so that a concurrent or interrupted
+    # process never sees a partially written model. Its name is unique, so
+    # threads optimizing the same model at the same time don't share it.
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(optimized_model), suffix=".onnx"
     )
+    os.close(fd)
 
-    tokens = get_file(
-        repo_id=repo_id,
-        filename="tokens.txt",
-        subfolder=".",
+    # Optimizations enabled by ORT_ENABLE_ALL may depend on the hardware,
+    # so don't persist them
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = (
+        ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
     )
+    sess_options.optimized_model_filepath = tmp
 
-    rule_fars = ""
-
-    if "vits-cantonese-hf-xiaomaiiwn" not in repo_id:
-        rule_fsts = ["phone.fst", "date.fst", "number.fst"]
-
-        rule_fsts = [
-            get_file(
-                repo_id=repo_id,
-                filename=f,
-                subfolder=".",
-            )
-            for f in rule_fsts
-        ]
-        rule_fsts = ",".join(rule_fsts)
-
-        #  rule_fars = get_file(
-        #      repo_id=repo_id,
-        #      filename="rule.far",
-        #      subfolder=".",
-        #  )
-        vits_dict_dir = "/tmp/dict"
-    else:
-        rule_fsts = get_file(
-            repo_id=repo_id,
-            filename="rule.fst",
-            subfolder=".",
+    try:
+        ort.InferenceSession(
+            model, sess_options, providers=["CPUExecutionProvider"]
         )
-        vits_dict_dir = ""
+        os.replace(tmp, optimized_model)
+    except Exception as e:
+        print(f"Failed to optimize {model}: {e}. Using it without optimizing.")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return model
+
+    return optimized_model
+
+
+def _build_tts(repo_id: str, spec_key: str) -> Tuple[sherpa_onnx.OfflineTts, int]:
+    spec = SPECS[spec_key]
+    repo_id = repo_id.split("|")[0]
 
+    repo_dir, model = _download(repo_id, spec)
+    model = _get_optimized_model(repo_id, os.path.join(repo_dir, model))
+
+    if spec.uses_lexicon:
+        lexicon = os.path.join(repo_dir, "lexicon.txt")
+    else:
+        lexicon = ""
+
+    tokens = os.path.join(repo_dir, "tokens.txt")
+    rule_fsts = ",".join(os.path.join(repo_dir, f) for f in spec.rule_fsts)
+    rule_fars = ",".join(os.path.join(repo_dir, f) for f in spec.rule_fars)
+
+    # sherpa-onnx does not expose onnxruntime session options. It only sets
+    # the number of threads and keeps onnxruntime's defaults for the rest,
+    # i.e., ORT_ENABLE_ALL graph optimizations and ORT_SEQUENTIAL execution.
     tts_config = sherpa_onnx.OfflineTtsConfig(
         model=sherpa_onnx.OfflineTtsModelConfig(
             vits=sherpa_onnx.OfflineTtsVitsModelConfig(
                 model=model,
                 lexicon=lexicon,
+                data_dir=spec.data_dir,
+                dict_dir=spec.dict_dir,
                 tokens=tokens,
-                dict_dir=vits_dict_dir,
-                length_scale=1.0 / speed,
             ),
-            provider="cpu",
-            debug=True,
-            num_threads=2,
+            provider=provider,
+            debug=debug,
+            num_threads=num_threads,
         ),
         rule_fsts=rule_fsts,
         rule_fars=rule_fars,
+        # onnxruntime's CPU memory arena grows to fit the largest input it
+        # has seen and sherpa-onnx offers no way to configure or shrink it.
+        # Running one sentence at a time bounds that growth by the longest
+        # sentence instead of the longest request.
         max_num_sentences=1,
     )
     tts = sherpa_onnx.OfflineTts(tts_config)
 
-    return tts
+    return tts, os.path.getsize(model)
 
 
-@lru_cache(maxsize=10)
-def get_pretrained_model(repo_id: str, speed: float) -> sherpa_onnx.OfflineTts:
-    if repo_id in chinese_models:
-        return chinese_models[repo_id](repo_id, speed)
-    elif repo_id in chinese_english_models:
-        return chinese_english_models[repo_id](repo_id, speed)
-    if repo_id in cantonese_models:
-        return cantonese_models[repo_id](repo_id, speed)
-    elif repo_id in english_models:
-        return english_models[repo_id](repo_id, speed)
-    elif repo_id in german_models:
-        return german_models[repo_id](repo_id, speed)
-    elif repo_id in spanish_models:
-        return spanish_models[repo_id](repo_id, speed)
-    elif repo_id in french_models:
-        return french_models[repo_id](repo_id, speed)
-    elif repo_id in ukrainian_models:
-        return ukrainian_models[repo_id](repo_id, speed)
-    elif repo_id in russian_models:
-        return russian_models[repo_id](repo_id, speed)
-    elif repo_id in arabic_models:
-        return arabic_models[repo_id](repo_id, speed)
-    elif repo_id in catalan_models:
-        return catalan_models[repo_id](repo_id, speed)
-    elif repo_id in czech_models:
-        return czech_models[repo_id](repo_id, speed)
-    elif repo_id in danish_models:
-        return danish_models[repo_id](repo_id, speed)
-    elif repo_id in greek_models:
-        return greek_models[repo_id](repo_id, speed)
-    elif repo_id in finnish_models:
-        return finnish_models[repo_id](repo_id, speed)
-    elif repo_id in hungarian_models:
-        return hungarian_models[repo_id](repo_id, speed)
-    elif repo_id in icelandic_models:
-        return icelandic_models[repo_id](repo_id, speed)
-    elif repo_id in italian_models:
-        return italian_models[repo_id](repo_id, speed)
-    elif repo_id in georgian_models:
-        return georgian_models[repo_id](repo_id, speed)
-    elif repo_id in kazakh_models:
-        return kazakh_models[repo_id](repo_id, speed)
-    elif repo_id in luxembourgish_models:
-        return luxembourgish_models[repo_id](repo_id, speed)
-    elif repo_id in nepali_models:
-        return nepali_models[repo_id](repo_id, speed)
-    elif repo_id in dutch_models:
-        return dutch_models[repo_id](repo_id, speed)
-    elif repo_id in norwegian_models:
-        return norwegian_models[repo_id](repo_id, speed)
-    elif repo_id in polish_models:
-        return polish_models[repo_id](repo_id, speed)
-    elif repo_id in portuguese_models:
-        return portuguese_models[repo_id](repo_id, speed)
-    elif repo_id in romanian_models:
-        return romanian_models[repo_id](repo_id, speed)
-    elif repo_id in slovak_models:
-        return slovak_models[repo_id](repo_id, speed)
-    elif repo_id in serbian_models:
-        return serbian_models[repo_id](repo_id, speed)
-    elif repo_id in swedish_models:
-        return swedish_models[repo_id](repo_id, speed)
-    elif repo_id in swahili_models:
-        return swahili_models[repo_id](repo_id, speed)
-    elif repo_id in turkish_models:
-        return turkish_models[repo_id](repo_id, speed)
-    elif repo_id in vietnamese_models:
-        return vietnamese_models[repo_id](repo_id, speed)
-    elif repo_id in bulgarian_models:
-        return bulgarian_models[repo_id](repo_id, speed)
-    elif repo_id in estonian_models:
-        return estonian_models[repo_id](repo_id, speed)
-    elif repo_id in irish_models:
-        return irish_models[repo_id](repo_id, speed)
-    elif repo_id in croatian_models:
-        return croatian_models[repo_id](repo_id, speed)
-    elif repo_id in lithuanian_models:
-        return lithuanian_models[repo_id](repo_id, speed)
-    elif repo_id in latvian_models:
-        return latvian_models[repo_id](repo_id, speed)
-    elif repo_id in maltese_models:
-        return maltese_models[repo_id](repo_id, speed)
-    elif repo_id in slovenian_models:
-        return slovenian_models[repo_id](repo_id, speed)
-    elif repo_id in bengali_models:
-        return bengali_models[repo_id](repo_id, speed)
-    elif repo_id in min_nan_models:
-        return min_nan_models[repo_id](repo_id, speed)
-    elif repo_id in thai_models:
-        return thai_models[repo_id](repo_id, speed)
-    elif repo_id in persian_models:
-        return persian_models[repo_id](repo_id, speed)
-    elif repo_id in korean_models:
-        return korean_models[repo_id](repo_id, speed)
-    elif repo_id in afrikaans_models:
-        return afrikaans_models[repo_id](repo_id, speed)
-    elif repo_id in gujarati_models:
-        return gujarati_models[repo_id](repo_id, speed)
-    elif repo_id in tswana_models:
-        return tswana_models[repo_id](repo_id, speed)
-    elif repo_id in welsh_models:
-        return welsh_models[repo_id](repo_id, speed)
-    else:
+# Upper bound for the total size of the .onnx files of all loaded models.
+# An onnxruntime session keeps its weights in memory, so this bounds the
+# memory used by cached models. Evicting a session is also the only way to
+# release its memory arena. It can be overridden with the environment
+# variable K2_TTS_MAX_MODEL_BYTES.
+max_model_bytes = int(os.environ.get("K2_TTS_MAX_MODEL_BYTES", 2 * 1024**3))
+
+# Maps repo_id to (tts, model_bytes), in least recently used order.
+# This is the only cache holding onnxruntime sessions.
+_loaded_models = OrderedDict()
+_loaded_model_bytes = 0
+_loaded_models_lock = threading.Lock()
+
+# Maps repo_id to a Future for models that are being loaded, so that
+# concurrent requests for the same model wait for a single load
+_loading_models = {}
+
+
+def get_pretrained_model(repo_id: str) -> sherpa_onnx.OfflineTts:
+    global _loaded_model_bytes
+
+    spec_key = all_models.get(repo_id)
+    if spec_key is None:
         raise ValueError(f"Unsupported repo_id: {repo_id}")
 
+    key = repo_id.split("|")[0]
+
+    with _loaded_models_lock:
+        if key in _loaded_models:
+            _loaded_models.move_to_end(key)
+            return _loaded_models[key][0]
+
+        future = _loading_models.get(key)
+        if future is None:
+            future = _loading_models[key] = Future()
+            is_loader = True
+        else:
+            is_loader = False
+
+    if not is_loader:
+        # Another thread is loading it. It raises if that thread failed.
+        return future.result()
+
+    try:
+        tts, model_bytes = _build_tts(repo_id, spec_key)
+    except BaseException as e:
+        with _loaded_models_lock:
+            del _loading_models[key]
+        future.set_exception(e)
+        raise
+
+    evicted = []
+    with _loaded_models_lock:
+        del _loading_models[key]
+        _loaded_models[key] = (tts, model_bytes)
+        _loaded_model_bytes += model_bytes
+
+        # Always keep the model we just loaded, even if it alone is over
+        # the budget
+        while _loaded_model_bytes > max_model_bytes and len(_loaded_models) > 1:
+            _, (evicted_tts, evicted_bytes) = _loaded_models.popitem(last=False)
+            _loaded_model_bytes -= evicted_bytes
+            evicted.append(evicted_tts)
+
+    # Destroying a session frees its weights and memory arena, which can
+    # take a while, so do it after releasing the lock. A session that is
+    # still generating audio for a request is destroyed once it finishes.
+    del evicted
+
+    future.set_result(tts)
+    return tts
+
 
 cantonese_models = {
-    "csukuangfj/vits-cantonese-hf-xiaomaiiwn": _get_vits_hf,
+    "csukuangfj/vits-cantonese-hf-xiaomaiiwn": "hf_cantonese",
 }
 
 chinese_english_models = {
-    "csukuangfj/vits-melo-tts-zh_en|1": _get_vits_hf,  # 1
+    "csukuangfj/vits-melo-tts-zh_en|1": "hf",  # 1
 }
 
 chinese_models = {
-    "csukuangfj/vits-zh-hf-fanchen-wnj|1": _get_vits_hf,  # 1
-    "csukuangfj/vits-zh-hf-fanchen-C|187": _get_vits_hf,  # 187
-    "csukuangfj/sherpa-onnx-vits-zh-ll|5": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-keqing|804": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-theresa|804": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-eula|804": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-echo|804": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-bronya|804": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-doom|804": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-zenyatta|804": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-abyssinvoker|804": _get_vits_hf,  # 804
-    "csukuangfj/vits-zh-hf-fanchen-ZhiHuiLaoZhe|1": _get_vits_hf,  # 1
-    "csukuangfj/vits-zh-hf-fanchen-ZhiHuiLaoZhe_new|1": _get_vits_hf,  # 1
-    "csukuangfj/vits-zh-hf-fanchen-unity|1": _get_vits_hf,  # 1
-    "csukuangfj/vits-zh-aishell3": _get_vits_zh_aishell3,
-    "csukuangfj/vits-piper-zh_CN-huayan-medium": _get_vits_piper,
-    #  "csukuangfj/vits-piper-zh_CN-huayan-x_low": _get_vits_piper,
+    "csukuangfj/vits-zh-hf-fanchen-wnj|1": "hf",  # 1
+    "csukuangfj/vits-zh-hf-fanchen-C|187": "hf",  # 187
+    "csukuangfj/sherpa-onnx-vits-zh-ll|5": "hf",  # 804
+    "csukuangfj/vits-zh-hf-keqing|804": "hf",  # 804
+    "csukuangfj/vits-zh-hf-theresa|804": "hf",  # 804
+    "csukuangfj/vits-zh-hf-eula|804": "hf",  # 804
+    "csukuangfj/vits-zh-hf-echo|804": "hf",  # 804
+    "csukuangfj/vits-zh-hf-bronya|804": "hf",  # 804
+    "csukuangfj/vits-zh-hf-doom|804": "hf",  # 804
+    "csukuangfj/vits-zh-hf-zenyatta|804": "hf",  # 804
+    "csukuangfj/vits-zh-hf-abyssinvoker|804": "hf",  # 804
+    "csukuangfj/vits-zh-hf-fanchen-ZhiHuiLaoZhe|1": "hf",  # 1
+    "csukuangfj/vits-zh-hf-fanchen-ZhiHuiLaoZhe_new|1": "hf",  # 1
+    "csukuangfj/vits-zh-hf-fanchen-unity|1": "hf",  # 1
+    "csukuangfj/vits-zh-aishell3": "zh_aishell3",
+    "csukuangfj/vits-piper-zh_CN-huayan-medium": "piper",
+    #  "csukuangfj/vits-piper-zh_CN-huayan-x_low": "piper",
 }
 
 english_models = {
-    "csukuangfj/vits-piper-en_US-glados|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-southern_english_male-medium|8 speakers": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-southern_english_female-medium|6 speakers": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-bryce-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-john-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-norman-medium|1 speaker": _get_vits_piper,
+    "csukuangfj/vits-piper-en_US-glados|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_GB-southern_english_male-medium|8 speakers": "piper",
+    "csukuangfj/vits-piper-en_GB-southern_english_female-medium|6 speakers": "piper",
+    "csukuangfj/vits-piper-en_US-bryce-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-john-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-norman-medium|1 speaker": "piper",
     # coqui-ai
-    "csukuangfj/vits-coqui-en-ljspeech|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-coqui-en-ljspeech-neon|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-coqui-en-vctk|109 speakers": _get_vits_piper,
+    "csukuangfj/vits-coqui-en-ljspeech|1 speaker": "piper",
+    "csukuangfj/vits-coqui-en-ljspeech-neon|1 speaker": "piper",
+    "csukuangfj/vits-coqui-en-vctk|109 speakers": "piper",
     # piper, US
-    "csukuangfj/vits-piper-en_GB-sweetbbak-amy|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-amy-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-amy-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-arctic-medium|18 speakers": _get_vits_piper,  # 18 speakers
-    "csukuangfj/vits-piper-en_US-danny-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-hfc_male-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-hfc_female-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-joe-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-kathleen-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-kusal-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-l2arctic-medium|24 speakers": _get_vits_piper,  # 24 speakers
-    "csukuangfj/vits-piper-en_US-lessac-high|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-lessac-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-lessac-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-libritts-high|904 speakers": _get_vits_piper,  # 904 speakers
-    "csukuangfj/vits-piper-en_US-libritts_r-medium|904 speakers": _get_vits_piper,  # 904 speakers
-    "csukuangfj/vits-piper-en_US-ljspeech-high|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-ljspeech-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-ryan-high|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-ryan-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_US-ryan-medium|1 speaker": _get_vits_piper,
+    "csukuangfj/vits-piper-en_GB-sweetbbak-amy|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-amy-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-amy-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-arctic-medium|18 speakers": "piper",  # 18 speakers
+    "csukuangfj/vits-piper-en_US-danny-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-hfc_male-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-hfc_female-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-joe-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-kathleen-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-kusal-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-l2arctic-medium|24 speakers": "piper",  # 24 speakers
+    "csukuangfj/vits-piper-en_US-lessac-high|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-lessac-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-lessac-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-libritts-high|904 speakers": "piper",  # 904 speakers
+    "csukuangfj/vits-piper-en_US-libritts_r-medium|904 speakers": "piper",  # 904 speakers
+    "csukuangfj/vits-piper-en_US-ljspeech-high|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-ljspeech-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-ryan-high|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-ryan-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_US-ryan-medium|1 speaker": "piper",
     # piper, GB
-    "csukuangfj/vits-piper-en_GB-alan-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-alan-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-alan-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-cori-high|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-cori-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-jenny_dioco-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-northern_english_male-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-semaine-medium|4 speakers": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-southern_english_female-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-en_GB-vctk-medium|109 speakers": _get_vits_piper,
+    "csukuangfj/vits-piper-en_GB-alan-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_GB-alan-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_GB-alan-medium": "piper",
+    "csukuangfj/vits-piper-en_GB-cori-high|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_GB-cori-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_GB-jenny_dioco-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_GB-northern_english_male-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_GB-semaine-medium|4 speakers": "piper",
+    "csukuangfj/vits-piper-en_GB-southern_english_female-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-en_GB-vctk-medium|109 speakers": "piper",
     #
-    "csukuangfj/vits-vctk|109 speakers": _get_vits_vctk,  # 109 speakers
-    "csukuangfj/vits-ljs|1 speaker": _get_vits_ljs,
+    "csukuangfj/vits-vctk|109 speakers": "vctk",  # 109 speakers
+    "csukuangfj/vits-ljs|1 speaker": "ljs",
 }
 
 german_models = {
-    "csukuangfj/vits-coqui-de-css10|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-eva_k-x_low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-karlsson-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-kerstin-low|1 speaker": _get_vits_piper,
-    #  "csukuangfj/vits-piper-de_DE-mls-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-pavoque-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-ramona-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-thorsten-low|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-thorsten-medium|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-thorsten-high|1 speaker": _get_vits_piper,
-    "csukuangfj/vits-piper-de_DE-thorsten_emotional-medium|8 speakers": _get_vits_piper,  # 8 speakers
+    "csukuangfj/vits-coqui-de-css10|1 speaker": "piper",
+    "csukuangfj/vits-piper-de_DE-eva_k-x_low|1 speaker": "piper",
+    "csukuangfj/vits-piper-de_DE-karlsson-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-de_DE-kerstin-low|1 speaker": "piper",
+    #  "csukuangfj/vits-piper-de_DE-mls-medium": "piper",
+    "csukuangfj/vits-piper-de_DE-pavoque-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-de_DE-ramona-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-de_DE-thorsten-low|1 speaker": "piper",
+    "csukuangfj/vits-piper-de_DE-thorsten-medium|1 speaker": "piper",
+    "csukuangfj/vits-piper-de_DE-thorsten-high|1 speaker": "piper",
+    "csukuangfj/vits-piper-de_DE-thorsten_emotional-medium|8 speakers": "piper",  # 8 speakers
 }
 
 spanish_models = {
-    #  "csukuangfj/vits-coqui-es-css10": _get_vits_piper,
-    "csukuangfj/vits-piper-es-glados-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-es_ES-carlfm-x_low": _get_vits_piper,
-    "csukuangfj/vits-piper-es_ES-davefx-medium": _get_vits_piper,
-    #  "csukuangfj/vits-piper-es_ES-mls_10246-low": _get_vits_piper,
-    #  "csukuangfj/vits-piper-es_ES-mls_9972-low": _get_vits_piper,
-    "csukuangfj/vits-piper-es_ES-sharvard-medium": _get_vits_piper,  # 2 speakers
-    "csukuangfj/vits-piper-es_MX-ald-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-es_MX-claude-high": _get_vits_piper,
-    "csukuangfj/vits-mimic3-es_ES-m-ailabs_low": _get_vits_piper,
+    #  "csukuangfj/vits-coqui-es-css10": "piper",
+    "csukuangfj/vits-piper-es-glados-medium": "piper",
+    "csukuangfj/vits-piper-es_ES-carlfm-x_low": "piper",
+    "csukuangfj/vits-piper-es_ES-davefx-medium": "piper",
+    #  "csukuangfj/vits-piper-es_ES-mls_10246-low": "piper",
+    #  "csukuangfj/vits-piper-es_ES-mls_9972-low": "piper",
+    "csukuangfj/vits-piper-es_ES-sharvard-medium": "piper",  # 2 speakers
+    "csukuangfj/vits-piper-es_MX-ald-medium": "piper",
+    "csukuangfj/vits-piper-es_MX-claude-high": "piper",
+    "csukuangfj/vits-mimic3-es_ES-m-ailabs_low": "piper",
 }
 
 french_models = {
-    "csukuangfj/vits-coqui-fr-css10": _get_vits_piper,
-    #  "csukuangfj/vits-piper-fr_FR-gilles-low": _get_vits_piper,
-    #  "csukuangfj/vits-piper-fr_FR-mls_1840-low": _get_vits_piper,
-    #  "csukuangfj/vits-piper-fr_FR-mls-medium": _get_vits_piper,  # 2 speakers, 0-femal, 1-male
-    "csukuangfj/vits-piper-fr_FR-upmc-medium": _get_vits_piper,  # 2 speakers, 0-femal, 1-male
-    "csukuangfj/vits-piper-fr_FR-tom-medium|1 speaker": _get_vits_piper,  # 2 speakers, 0-femal, 1-male
-    "csukuangfj/vits-piper-fr_FR-siwis-low": _get_vits_piper,  # female
-    "csukuangfj/vits-piper-fr_FR-siwis-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-fr_FR-tjiho-model1": _get_vits_piper,
-    "csukuangfj/vits-piper-fr_FR-tjiho-model2": _get_vits_piper,
-    "csukuangfj/vits-piper-fr_FR-tjiho-model3": _get_vits_piper,
+    "csukuangfj/vits-coqui-fr-css10": "piper",
+    #  "csukuangfj/vits-piper-fr_FR-gilles-low": "piper",
+    #  "csukuangfj/vits-piper-fr_FR-mls_1840-low": "piper",
+    #  "csukuangfj/vits-piper-fr_FR-mls-medium": "piper",  # 2 speakers, 0-femal, 1-male
+    "csukuangfj/vits-piper-fr_FR-upmc-medium": "piper",  # 2 speakers, 0-femal, 1-male
+    "csukuangfj/vits-piper-fr_FR-tom-medium|1 speaker": "piper",  # 2 speakers, 0-femal, 1-male
+    "csukuangfj/vits-piper-fr_FR-siwis-low": "piper",  # female
+    "csukuangfj/vits-piper-fr_FR-siwis-medium": "piper",
+    "csukuangfj/vits-piper-fr_FR-tjiho-model1": "piper",
+    "csukuangfj/vits-piper-fr_FR-tjiho-model2": "piper",
+    "csukuangfj/vits-piper-fr_FR-tjiho-model3": "piper",
 }
 
 ukrainian_models = {
-    "csukuangfj/vits-piper-uk_UA-lada-x_low": _get_vits_piper,
-    "csukuangfj/vits-coqui-uk-mai": _get_vits_piper,
-    #  "csukuangfj/vits-piper-uk_UA-ukrainian_tts-medium": _get_vits_piper, # does not work somehow
+    "csukuangfj/vits-piper-uk_UA-lada-x_low": "piper",
+    "csukuangfj/vits-coqui-uk-mai": "mms",
+    #  "csukuangfj/vits-piper-uk_UA-ukrainian_tts-medium": "piper", # does not work somehow
 }
 
 russian_models = {
-    "csukuangfj/vits-piper-ru_RU-denis-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-ru_RU-dmitri-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-ru_RU-irina-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-ru_RU-ruslan-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-ru_RU-denis-medium": "piper",
+    "csukuangfj/vits-piper-ru_RU-dmitri-medium": "piper",
+    "csukuangfj/vits-piper-ru_RU-irina-medium": "piper",
+    "csukuangfj/vits-piper-ru_RU-ruslan-medium": "piper",
 }
 
 arabic_models = {
-    "csukuangfj/vits-piper-ar_JO-kareem-low": _get_vits_piper,
-    "csukuangfj/vits-piper-ar_JO-kareem-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-ar_JO-kareem-low": "piper",
+    "csukuangfj/vits-piper-ar_JO-kareem-medium": "piper",
 }
 
 catalan_models = {
-    "csukuangfj/vits-piper-ca_ES-upc_ona-x_low": _get_vits_piper,
-    "csukuangfj/vits-piper-ca_ES-upc_ona-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-ca_ES-upc_pau-x_low": _get_vits_piper,
+    "csukuangfj/vits-piper-ca_ES-upc_ona-x_low": "piper",
+    "csukuangfj/vits-piper-ca_ES-upc_ona-medium": "piper",
+    "csukuangfj/vits-piper-ca_ES-upc_pau-x_low": "piper",
 }
 
 czech_models = {
-    "csukuangfj/vits-piper-cs_CZ-jirka-low": _get_vits_piper,
-    "csukuangfj/vits-piper-cs_CZ-jirka-medium": _get_vits_piper,
-    "csukuangfj/vits-coqui-cs-cv": _get_vits_piper,
+    "csukuangfj/vits-piper-cs_CZ-jirka-low": "piper",
+    "csukuangfj/vits-piper-cs_CZ-jirka-medium": "piper",
+    "csukuangfj/vits-coqui-cs-cv": "piper",
 }
 
 danish_models = {
-    "csukuangfj/vits-coqui-da-cv": _get_vits_piper,
-    "csukuangfj/vits-piper-da_DK-talesyntese-medium": _get_vits_piper,
+    "csukuangfj/vits-coqui-da-cv": "piper",
+    "csukuangfj/vits-piper-da_DK-talesyntese-medium": "piper",
 }
 
 greek_models = {
-    "csukuangfj/vits-piper-el_GR-rapunzelina-low": _get_vits_piper,
-    #  "csukuangfj/vits-mimic3-el_GR-rapunzelina_low": _get_vits_piper,
+    "csukuangfj/vits-piper-el_GR-rapunzelina-low": "piper",
+    #  "csukuangfj/vits-mimic3-el_GR-rapunzelina_low": "piper",
 }
 
 finnish_models = {
-    "csukuangfj/vits-coqui-fi-css10": _get_vits_piper,
-    "csukuangfj/vits-piper-fi_FI-harri-low": _get_vits_piper,
-    "csukuangfj/vits-piper-fi_FI-harri-medium": _get_vits_piper,
-    "csukuangfj/vits-mimic3-fi_FI-harri-tapani-ylilammi_low": _get_vits_piper,
+    "csukuangfj/vits-coqui-fi-css10": "piper",
+    "csukuangfj/vits-piper-fi_FI-harri-low": "piper",
+    "csukuangfj/vits-piper-fi_FI-harri-medium": "piper",
+    "csukuangfj/vits-mimic3-fi_FI-harri-tapani-ylilammi_low": "piper",
 }
 
 hungarian_models = {
-    #  "csukuangfj/vits-coqui-hu-css10": _get_vits_piper,
-    "csukuangfj/vits-piper-hu_HU-anna-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-hu_HU-berta-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-hu_HU-imre-medium": _get_vits_piper,
-    "csukuangfj/vits-mimic3-hu_HU-diana-majlinger_low": _get_vits_piper,
+    #  "csukuangfj/vits-coqui-hu-css10": "piper",
+    "csukuangfj/vits-piper-hu_HU-anna-medium": "piper",
+    "csukuangfj/vits-piper-hu_HU-berta-medium": "piper",
+    "csukuangfj/vits-piper-hu_HU-imre-medium": "piper",
+    "csukuangfj/vits-mimic3-hu_HU-diana-majlinger_low": "piper",
 }
 
 icelandic_models = {
-    "csukuangfj/vits-piper-is_IS-bui-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-is_IS-salka-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-is_IS-steinn-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-is_IS-ugla-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-is_IS-bui-medium": "piper",
+    "csukuangfj/vits-piper-is_IS-salka-medium": "piper",
+    "csukuangfj/vits-piper-is_IS-steinn-medium": "piper",
+    "csukuangfj/vits-piper-is_IS-ugla-medium": "piper",
 }
 
 italian_models = {
-    "csukuangfj/vits-piper-it_IT-riccardo-x_low": _get_vits_piper,
-    "csukuangfj/vits-piper-it_IT-paola-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-it_IT-riccardo-x_low": "piper",
+    "csukuangfj/vits-piper-it_IT-paola-medium": "piper",
 }
 
 georgian_models = {
-    "csukuangfj/vits-piper-ka_GE-natia-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-ka_GE-natia-medium": "piper",
 }
 
 kazakh_models = {
-    "csukuangfj/vits-piper-kk_KZ-iseke-x_low": _get_vits_piper,
-    "csukuangfj/vits-piper-kk_KZ-issai-high": _get_vits_piper,
-    "csukuangfj/vits-piper-kk_KZ-raya-x_low": _get_vits_piper,
+    "csukuangfj/vits-piper-kk_KZ-iseke-x_low": "piper",
+    "csukuangfj/vits-piper-kk_KZ-issai-high": "piper",
+    "csukuangfj/vits-piper-kk_KZ-raya-x_low": "piper",
 }
 
 luxembourgish_models = {
-    "csukuangfj/vits-piper-lb_LU-marylux-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-lb_LU-marylux-medium": "piper",
 }
 
 nepali_models = {
-    "csukuangfj/vits-piper-ne_NP-google-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-ne_NP-google-x_low": _get_vits_piper,
-    "csukuangfj/vits-mimic3-ne_NP-ne-google_low": _get_vits_piper,
+    "csukuangfj/vits-piper-ne_NP-google-medium": "piper",
+    "csukuangfj/vits-piper-ne_NP-google-x_low": "piper",
+    "csukuangfj/vits-mimic3-ne_NP-ne-google_low": "piper",
 }
 
 dutch_models = {
-    "csukuangfj/vits-coqui-nl-css10": _get_vits_piper,
-    "csukuangfj/vits-piper-nl_BE-nathalie-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-nl_BE-nathalie-x_low": _get_vits_piper,
-    "csukuangfj/vits-piper-nl_BE-rdh-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-nl_BE-rdh-x_low": _get_vits_piper,
-    #  "csukuangfj/vits-piper-nl_NL-mls-medium": _get_vits_piper,
-    #  "csukuangfj/vits-piper-nl_NL-mls_5809-low": _get_vits_piper,
-    #  "csukuangfj/vits-piper-nl_NL-mls_7432-low": _get_vits_piper,
+    "csukuangfj/vits-coqui-nl-css10": "piper",
+    "csukuangfj/vits-piper-nl_BE-nathalie-medium": "piper",
+    "csukuangfj/vits-piper-nl_BE-nathalie-x_low": "piper",
+    "csukuangfj/vits-piper-nl_BE-rdh-medium": "piper",
+    "csukuangfj/vits-piper-nl_BE-rdh-x_low": "piper",
+    #  "csukuangfj/vits-piper-nl_NL-mls-medium": "piper",
+    #  "csukuangfj/vits-piper-nl_NL-mls_5809-low": "piper",
+    #  "csukuangfj/vits-piper-nl_NL-mls_7432-low": "piper",
 }
 
 norwegian_models = {
-    "csukuangfj/vits-piper-no_NO-talesyntese-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-no_NO-talesyntese-medium": "piper",
 }
 
 polish_models = {
-    "csukuangfj/vits-coqui-pl-mai_female": _get_vits_piper,
-    "csukuangfj/vits-piper-pl_PL-darkman-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-pl_PL-gosia-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-pl_PL-mc_speech-medium": _get_vits_piper,
-    #  "csukuangfj/vits-piper-pl_PL-mls_6892-low": _get_vits_piper,
-    "csukuangfj/vits-mimic3-pl_PL-m-ailabs_low": _get_vits_piper,
+    "csukuangfj/vits-coqui-pl-mai_female": "piper",
+    "csukuangfj/vits-piper-pl_PL-darkman-medium": "piper",
+    "csukuangfj/vits-piper-pl_PL-gosia-medium": "piper",
+    "csukuangfj/vits-piper-pl_PL-mc_speech-medium": "piper",
+    #  "csukuangfj/vits-piper-pl_PL-mls_6892-low": "piper",
+    "csukuangfj/vits-mimic3-pl_PL-m-ailabs_low": "piper",
 }
 
 portuguese_models = {
-    "csukuangfj/vits-coqui-pt-cv": _get_vits_piper,
-    "csukuangfj/vits-piper-pt_BR-edresson-low": _get_vits_piper,
-    "csukuangfj/vits-piper-pt_BR-faber-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-pt_PT-tugao-medium": _get_vits_piper,
+    "csukuangfj/vits-coqui-pt-cv": "piper",
+    "csukuangfj/vits-piper-pt_BR-edresson-low": "piper",
+    "csukuangfj/vits-piper-pt_BR-faber-medium": "piper",
+    "csukuangfj/vits-piper-pt_PT-tugao-medium": "piper",
 }
 
 romanian_models = {
-    "csukuangfj/vits-coqui-ro-cv": _get_vits_piper,
-    "csukuangfj/vits-piper-ro_RO-mihai-medium": _get_vits_piper,
+    "csukuangfj/vits-coqui-ro-cv": "piper",
+    "csukuangfj/vits-piper-ro_RO-mihai-medium": "piper",
 }
 
 
 slovak_models = {
-    "csukuangfj/vits-coqui-sk-cv": _get_vits_piper,
-    "csukuangfj/vits-piper-sk_SK-lili-medium": _get_vits_piper,
+    "csukuangfj/vits-coqui-sk-cv": "piper",
+    "csukuangfj/vits-piper-sk_SK-lili-medium": "piper",
 }
 
 serbian_models = {
-    "csukuangfj/vits-piper-sr_RS-serbski_institut-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-sr_RS-serbski_institut-medium": "piper",
 }
 
 swedish_models = {
-    "csukuangfj/vits-coqui-sv-cv": _get_vits_piper,
-    "csukuangfj/vits-piper-sv_SE-nst-medium": _get_vits_piper,
+    "csukuangfj/vits-coqui-sv-cv": "piper",
+    "csukuangfj/vits-piper-sv_SE-nst-medium": "piper",
 }
 
 swahili_models = {
-    "csukuangfj/vits-piper-sw_CD-lanfrica-medium": _get_vits_piper,
+    "csukuangfj/vits-piper-sw_CD-lanfrica-medium": "piper",
 }
 
 turkish_models = {
-    "csukuangfj/vits-piper-tr_TR-dfki-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-tr_TR-fahrettin-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-tr_TR-fettah-medium|1 speaker": _get_vits_piper,
+    "csukuangfj/vits-piper-tr_TR-dfki-medium": "piper",
+    "csukuangfj/vits-piper-tr_TR-fahrettin-medium": "piper",
+    "csukuangfj/vits-piper-tr_TR-fettah-medium|1 speaker": "piper",
 }
 
 vietnamese_models = {
-    "csukuangfj/vits-piper-vi_VN-25hours_single-low": _get_vits_piper,
-    "csukuangfj/vits-piper-vi_VN-vais1000-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-vi_VN-vivos-x_low": _get_vits_piper,
-    "csukuangfj/vits-mimic3-vi_VN-vais1000_low": _get_vits_piper,
+    "csukuangfj/vits-piper-vi_VN-25hours_single-low": "piper",
+    "csukuangfj/vits-piper-vi_VN-vais1000-medium": "piper",
+    "csukuangfj/vits-piper-vi_VN-vivos-x_low": "piper",
+    "csukuangfj/vits-mimic3-vi_VN-vais1000_low": "piper",
 }
 
 bulgarian_models = {
-    "csukuangfj/vits-coqui-bg-cv": _get_vits_piper,
+    "csukuangfj/vits-coqui-bg-cv": "piper",
 }
 
 estonian_models = {
-    "csukuangfj/vits-coqui-et-cv": _get_vits_piper,
+    "csukuangfj/vits-coqui-et-cv": "piper",
 }
 
 irish_models = {
-    "csukuangfj/vits-coqui-ga-cv": _get_vits_piper,
+    "csukuangfj/vits-coqui-ga-cv": "piper",
 }
 
 croatian_models = {
-    "csukuangfj/vits-coqui-hr-cv": _get_vits_piper,
+    "csukuangfj/vits-coqui-hr-cv": "piper",
 }
 
 lithuanian_models = {
-    "csukuangfj/vits-coqui-lt-cv": _get_vits_piper,
+    "csukuangfj/vits-coqui-lt-cv": "piper",
 }
 
 latvian_models = {
-    "csukuangfj/vits-coqui-lv-cv": _get_vits_piper,
+    "csukuangfj/vits-coqui-lv-cv": "piper",
 }
 
 maltese_models = {
-    "csukuangfj/vits-coqui-mt-cv": _get_vits_piper,
+    "csukuangfj/vits-coqui-mt-cv": "piper",
 }
 
 slovenian_models = {
-    "csukuangfj/vits-piper-sl_SI-artur-medium": _get_vits_piper,
-    "csukuangfj/vits-coqui-sl-cv": _get_vits_piper,
+    "csukuangfj/vits-piper-sl_SI-artur-medium": "piper",
+    "csukuangfj/vits-coqui-sl-cv": "piper",
 }
 
 # Bangla
 bengali_models = {
-    "csukuangfj/vits-coqui-bn-custom_female": _get_vits_piper,
-    "csukuangfj/vits-mimic3-bn-multi_low": _get_vits_piper,
+    "csukuangfj/vits-coqui-bn-custom_female": "piper",
+    "csukuangfj/vits-mimic3-bn-multi_low": "piper",
 }
 
 min_nan_models = {
-    "csukuangfj/vits-mms-nan": _get_vits_mms,
+    "csukuangfj/vits-mms-nan": "mms",
 }
 
 thai_models = {
-    "csukuangfj/vits-mms-tha": _get_vits_mms,
+    "csukuangfj/vits-mms-tha": "mms",
 }
 
 persian_models = {
-    "csukuangfj/vits-piper-fa_IR-amir-medium": _get_vits_piper,
-    "csukuangfj/vits-piper-fa_IR-gyro-medium": _get_vits_piper,
-    "csukuangfj/vits-mimic3-fa-haaniye_low": _get_vits_piper,
+    "csukuangfj/vits-piper-fa_IR-amir-medium": "piper",
+    "csukuangfj/vits-piper-fa_IR-gyro-medium": "piper",
+    "csukuangfj/vits-mimic3-fa-haaniye_low": "piper",
 }
 
 korean_models = {
-    "csukuangfj/vits-mimic3-ko_KO-kss_low": _get_vits_piper,
+    "csukuangfj/vits-mimic3-ko_KO-kss_low": "piper",
 }
 
 
 afrikaans_models = {
-    "csukuangfj/vits-mimic3-af_ZA-google-nwu_low": _get_vits_piper,
+    "csukuangfj/vits-mimic3-af_ZA-google-nwu_low": "piper",
 }
 
 gujarati_models = {
-    "csukuangfj/vits-mimic3-gu_IN-cmu-indic_low": _get_vits_piper,
+    "csukuangfj/vits-mimic3-gu_IN-cmu-indic_low": "piper",
 }
 
 tswana_models = {
-    "csukuangfj/vits-mimic3-tn_ZA-google-nwu_low": _get_vits_piper,
+    "csukuangfj/vits-mimic3-tn_ZA-google-nwu_low": "piper",
 }
 
 welsh_models = {
-    "csukuangfj/vits-piper-cy_GB-gwryw_gogleddol-medium|1 speaker": _get_vits_piper,
-}
-
-language_to_models = {
-    "English": list(english_models.keys()),
-    "Chinese (Mandarin, 普通话)": list(chinese_models.keys()),
-    "Chinese+English": list(chinese_english_models.keys()),
-    "Cantonese (粤语)": list(cantonese_models.keys()),
-    "Min-nan (闽南话)": list(min_nan_models.keys()),
-    "Arabic": list(arabic_models.keys()),
-    "Afrikaans": list(afrikaans_models.keys()),
-    "Bengali": list(bengali_models.keys()),
-    "Bulgarian": list(bulgarian_models.keys()),
-    "Catalan": list(catalan_models.keys()),
-    "Croatian": list(croatian_models.keys()),
-    "Czech": list(czech_models.keys()),
-    "Danish": list(danish_models.keys()),
-    "Dutch": list(dutch_models.keys()),
-    "Estonian": list(estonian_models.keys()),
-    "Finnish": list(finnish_models.keys()),
-    "French": list(french_models.keys()),
-    "Georgian": list(georgian_models.keys()),
-    "German": list(german_models.keys()),
-    "Greek": list(greek_models.keys()),
-    "Gujarati": list(gujarati_models.keys()),
-    "Hungarian": list(hungarian_models.keys()),
-    "Icelandic": list(icelandic_models.keys()),
-    "Irish": list(irish_models.keys()),
-    "Italian": list(italian_models.keys()),
-    "Kazakh": list(kazakh_models.keys()),
-    "Korean": list(korean_models.keys()),
-    "Latvian": list(latvian_models.keys()),
-    "Lithuanian": list(lithuanian_models.keys()),
-    "Luxembourgish": list(luxembourgish_models.keys()),
-    "Maltese": list(maltese_models.keys()),
-    "Nepali": list(nepali_models.keys()),
-    "Norwegian": list(norwegian_models.keys()),
-    "Persian": list(persian_models.keys()),
-    "Polish": list(polish_models.keys()),
-    "Portuguese": list(portuguese_models.keys()),
-    "Romanian": list(romanian_models.keys()),
-    "Russian": list(russian_models.keys()),
-    "Serbian": list(serbian_models.keys()),
-    "Slovak": list(slovak_models.keys()),
-    "Slovenian": list(slovenian_models.keys()),
-    "Spanish": list(spanish_models.keys()),
-    "Swahili": list(swahili_models.keys()),
-    "Swedish": list(swedish_models.keys()),
-    "Thai": list(thai_models.keys()),
-    "Tswana": list(tswana_models.keys()),
-    "Turkish": list(turkish_models.keys()),
-    "Ukrainian": list(ukrainian_models.keys()),
-    "Vietnamese": list(vietnamese_models.keys()),
-    "Welsh": list(welsh_models.keys()),
+    "csukuangfj/vits-piper-cy_GB-gwryw_gogleddol-medium|1 speaker": "piper",
+}
+
+_language_to_model_dicts = {
+    "English": english_models,
+    "Chinese (Mandarin, 普通话)": chinese_models,
+    "Chinese+English": chinese_english_models,
+    "Cantonese (粤语)": cantonese_models,
+    "Min-nan (闽南话)": min_nan_models,
+    "Arabic": arabic_models,
+    "Afrikaans": afrikaans_models,
+    "Bengali": bengali_models,
+    "Bulgarian": bulgarian_models,
+    "Catalan": catalan_models,
+    "Croatian": croatian_models,
+    "Czech": czech_models,
+    "Danish": danish_models,
+    "Dutch": dutch_models,
+    "Estonian": estonian_models,
+    "Finnish": finnish_models,
+    "French": french_models,
+    "Georgian": georgian_models,
+    "German": german_models,
+    "Greek": greek_models,
+    "Gujarati": gujarati_models,
+    "Hungarian": hungarian_models,
+    "Icelandic": icelandic_models,
+    "Irish": irish_models,
+    "Italian": italian_models,
+    "Kazakh": kazakh_models,
+    "Korean": korean_models,
+    "Latvian": latvian_models,
+    "Lithuanian": lithuanian_models,
+    "Luxembourgish": luxembourgish_models,
+    "Maltese": maltese_models,
+    "Nepali": nepali_models,
+    "Norwegian": norwegian_models,
+    "Persian": persian_models,
+    "Polish": polish_models,
+    "Portuguese": portuguese_models,
+    "Romanian": romanian_models,
+    "Russian": russian_models,
+    "Serbian": serbian_models,
+    "Slovak": slovak_models,
+    "Slovenian": slovenian_models,
+    "Spanish": spanish_models,
+    "Swahili": swahili_models,
+    "Swedish": swedish_models,
+    "Thai": thai_models,
+    "Tswana": tswana_models,
+    "Turkish": turkish_models,
+    "Ukrainian": ukrainian_models,
+    "Vietnamese": vietnamese_models,
+    "Welsh": welsh_models,
+}
+
+# Read-only, since it is shared by all requests
+language_to_models = MappingProxyType(
+    {
+        language: tuple(models)
+        for language, models in _language_to_model_dicts.items()
+    }
+)
+
+# Maps every supported repo_id to the key of its ModelSpec in SPECS
+all_models = {
+    repo_id: spec_key
+    for models in _language_to_model_dicts.values()
+    for repo_id, spec_key in models.items()
+}
+
+# Maps every supported repo_id, without the "|..." suffix, to the filename
+# of its model without the .onnx suffix
+model_names = {
+    r.split("|")[0]: SPECS[spec_key].model_name(r.split("|")[0])
+    for r, spec_key in all_models.items()
 }